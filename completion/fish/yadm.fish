@@ -33,9 +33,15 @@ complete -f -c yadm -n '__fish_yadm_using_command clone' -s b            -d 'bra
 complete -x -c yadm -n '__fish_yadm_using_command clone' -s f            -d 'force to overwrite'
 complete -x -c yadm -n '__fish_yadm_using_command clone' -l bootstrap    -d 'force bootstrap to run'
 complete -x -c yadm -n '__fish_yadm_using_command clone' -l no-bootstrap -d 'prevent bootstrap from beingrun'
+complete -x -c yadm -n '__fish_yadm_using_command clone' -l filter       -d 'partial clone filter (e.g. blob:none)'
+complete -x -c yadm -n '__fish_yadm_using_command clone' -l depth        -d 'create a shallow clone'
 
 complete -x -c yadm -n '__fish_yadm_needs_command' -a 'alt'       -d 'Create links for alternates'
+complete -x -c yadm -n '__fish_yadm_using_command alt' -l no-cache -d 'ignore cached alternates'
+complete -x -c yadm -n '__fish_yadm_using_command alt' -s j -l jobs -d 'render templates using parallel jobs'
 complete -x -c yadm -n '__fish_yadm_needs_command' -a 'bootstrap' -d 'Execute $HOME/.config/yadm/bootstrap'
+complete -x -c yadm -n '__fish_yadm_needs_command' -a 'bundle'    -d 'Write the repository to a bundle file'
+complete -F -c yadm -n '__fish_yadm_using_command bundle' -l archive -d 'include the encrypted archive'
 complete -x -c yadm -n '__fish_yadm_needs_command' -a 'perms'     -d 'Fix perms for private files'
 complete -x -c yadm -n '__fish_yadm_needs_command' -a 'enter'     -d 'Run sub-shell with GIT variables set'
 complete    -c yadm -n '__fish_yadm_needs_command' -a 'git-crypt' -d 'Run git-crypt commands for the yadm repo'
@@ -53,9 +59,10 @@ complete -x -c yadm -n '__fish_yadm_using_command list' -s a -d 'list all manage
 complete -x -c yadm -n '__fish_yadm_needs_command' -a 'encrypt' -d 'Encrypt files'
 complete -x -c yadm -n '__fish_yadm_needs_command' -a 'decrypt' -d 'Decrypt files'
 complete -x -c yadm -n '__fish_yadm_using_command decrypt' -s l -d 'list the files stored without extracting'
+complete -F -c yadm -n '__fish_yadm_using_command decrypt'
 
 complete -x -c yadm -n '__fish_yadm_needs_command' -a 'introspect' -d 'Report internal yadm data'
-complete -x -c yadm -n '__fish_yadm_using_command introspect' -a (printf -- '%s\n' 'commands configs repo switches') -d 'category'
+complete -x -c yadm -n '__fish_yadm_using_command introspect' -a (printf -- '%s\n' 'commands configs facts repo switches') -d 'category'
 
 complete -x -c yadm -n '__fish_yadm_needs_command' -a 'gitconfig' -d 'Pass options to the git config command'
 complete -x -c yadm -n '__fish_yadm_needs_command' -a 'config'    -d 'Configure a setting'
@@ -123,6 +123,7 @@ def supported_commands():
     return [
         "alt",
         "bootstrap",
+        "bundle",
         "clean",
         "clone",
         "config",
@@ -157,6 +158,11 @@ def supported_configs():
         "local.os",
         "local.user",
         "yadm.alt-copy",
+        "yadm.alt-jobs",
+        "yadm.archive-compression",
+        "yadm.archive-format",
+        "yadm.archive-index",
+        "yadm.archive-shards",
         "yadm.auto-alt",
         "yadm.auto-exclude",
         "yadm.auto-perms",
@@ -373,6 +379,17 @@ def yadm_cmd(paths):
     return command_list
 
 
+@pytest.fixture()
+def git_calls(tmpdir, yadm_cmd):
+    """Configure yadm to use a git which records its commands in a file"""
+    calls = tmpdir.join("calls")
+    git = tmpdir.join("git")
+    git.write(f'#!/bin/sh\necho "$*" >> {calls}\nexec git "$@"\n')
+    git.chmod(0o755)
+    os.system(" ".join(yadm_cmd("config", "yadm.git-program", str(git))))
+    return calls
+
+
 class NoRelativePath(Exception):
     """Exception when finding relative paths"""
 
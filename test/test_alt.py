@@ -194,8 +194,8 @@ def test_auto_alt(runner, yadm_cmd, paths, autoalt):
     if autoalt:
         os.system(" ".join(yadm_cmd("config", "yadm.auto-alt", autoalt)))
 
-    utils.create_alt_files(paths, "##default")
-    run = runner(yadm_cmd("status"))
+    utils.create_alt_files(paths, "##default", tracked=False)
+    run = runner(yadm_cmd("add", *[str(paths.work.join(path + "##default")) for path in TEST_PATHS]))
     assert run.success
     assert run.err == ""
     linked = utils.parse_alt_output(run.out)
@@ -217,6 +217,19 @@ def test_auto_alt(runner, yadm_cmd, paths, autoalt):
                 assert str(paths.work.join(source_file)) not in linked
 
 
+@pytest.mark.usefixtures("ds1_copy")
+def test_auto_alt_read_only(runner, yadm_cmd, paths):
+    """Test auto alt is skipped for read-only commands"""
+
+    utils.create_alt_files(paths, "##default")
+    run = runner(yadm_cmd("status"))
+    assert run.success
+    assert run.err == ""
+
+    for link_path in TEST_PATHS:
+        assert not paths.work.join(link_path).exists()
+
+
 @pytest.mark.usefixtures("ds1_copy")
 @pytest.mark.parametrize("autoexclude", [None, "true", "false"])
 def test_alt_exclude(runner, yadm_cmd, paths, autoexclude):
@@ -339,3 +352,208 @@ def setup_standard_yadm_dir(paths):
     std_yadm_data.join("repo.git").mksymlinkto(paths.repo, absolute=1)
     std_yadm_dir.join("encrypt").mksymlinkto(paths.encrypt, absolute=1)
     return std_yadm_dir, std_yadm_data
+
+
+@pytest.mark.usefixtures("ds1_copy")
+@pytest.mark.parametrize("skip_hash", [False, True], ids=["hash", "skip-hash"])
+def test_auto_alt_incremental(runner, yadm_cmd, paths, tst_sys, skip_hash):
+    """Test auto alt only processes alternates which may have changed"""
+
+    utils.create_alt_files(paths, "##default")
+    run = runner(yadm_cmd("alt"))
+    assert run.success
+    if skip_hash:
+        # the index checksum is always zero, so it can't tell if the index changed
+        run = runner(yadm_cmd("gitconfig", "index.skipHash", "true"))
+        assert run.success
+
+    # point all links elsewhere, to detect which are updated
+    for link_path in TEST_PATHS:
+        paths.work.join(link_path).remove()
+        os.symlink("tampered", paths.work.join(link_path))
+
+    # committing an unrelated file doesn't touch any links
+    paths.work.join("unrelated").write("unrelated")
+    run = runner(yadm_cmd("add", str(paths.work.join("unrelated"))))
+    assert run.success
+    if skip_hash and paths.repo.join("index").read_binary()[-20:] != bytes(20):
+        pytest.skip("index.skipHash requires git 2.40 or later")
+    run = runner(yadm_cmd("commit", "-m", "Add unrelated"))
+    assert run.success
+    for link_path in TEST_PATHS:
+        assert os.readlink(paths.work.join(link_path)) == "tampered"
+
+    # adding a better alternate only relinks that target
+    better = paths.work.join(utils.ALT_FILE1 + f"##os.{tst_sys}")
+    better.write("better")
+    run = runner(yadm_cmd("add", str(better)))
+    assert run.success
+    assert run.err == ""
+    assert paths.work.join(utils.ALT_FILE1).read() == "better"
+    for link_path in TEST_PATHS[1:]:
+        assert os.readlink(paths.work.join(link_path)) == "tampered"
+
+    # alternates which no longer match remove their stale links
+    source = str(paths.work.join(utils.ALT_FILE2 + "##default"))
+    run = runner(yadm_cmd("mv", source, source.replace("##default", "##os.nonexistent")))
+    assert run.success
+    assert run.err == ""
+    assert paths.work.join(utils.ALT_FILE1).read() == "better"
+    assert not os.path.lexists(paths.work.join(utils.ALT_FILE2))
+    assert os.readlink(paths.work.join(utils.ALT_DIR)) == "tampered"
+
+
+@pytest.mark.usefixtures("ds1_copy")
+def test_auto_alt_templates(runner, yadm_cmd, paths):
+    """Test auto alt processes templates even if the repo is unchanged"""
+
+    include = paths.work.join("include")
+    include.write("original")
+    template = paths.work.join("rendered##template")
+    template.write('{% include "include" %}\n')
+    run = runner(yadm_cmd("add", str(template)))
+    assert run.success
+    assert paths.work.join("rendered").read() == "original\n"
+
+    # neither HEAD nor the index change, but the included file did
+    include.write("changed")
+    run = runner(yadm_cmd("checkout", "--", str(template)))
+    assert run.success
+    assert run.err == ""
+    assert paths.work.join("rendered").read() == "changed\n"
+
+
+@pytest.mark.usefixtures("ds1_copy")
+@pytest.mark.parametrize("jobs", ["1", "2"])
+def test_include_alternate(runner, yadm_cmd, paths, jobs):
+    """Test templates see the current output of templates they include"""
+
+    first = paths.work.join("first##template")
+    first.write("one")
+    second = paths.work.join("second##template")
+    second.write('{% include "first" %}\n')
+    run = runner(yadm_cmd("add", str(first), str(second)))
+    assert run.success
+
+    run = runner(yadm_cmd("alt", "-j", jobs))
+    assert run.success
+    assert run.err == ""
+    assert paths.work.join("first").read() == "one\n"
+    assert paths.work.join("second").read() == "one\n"
+
+    first.write("two")
+    run = runner(yadm_cmd("alt", "-j", jobs))
+    assert run.success
+    assert run.err == ""
+    assert paths.work.join("first").read() == "two\n"
+    assert paths.work.join("second").read() == "two\n"
+
+
+@pytest.mark.usefixtures("ds1_copy")
+def test_include_alternate_path(runner, yadm_cmd, paths, tst_sys):
+    """Test templates including an alternate through a relative path"""
+
+    alternate = paths.work.join("alternate##default")
+    alternate.write("default")
+    dot = paths.work.join("dot##template")
+    dot.write('{% include "./alternate" %}\n')
+    dotdot = paths.work.join("dir", "dotdot##template")
+    dotdot.write('{% include "../alternate" %}\n', ensure=True)
+    run = runner(yadm_cmd("add", str(alternate), str(dot), str(dotdot)))
+    assert run.success
+    assert run.err == ""
+    assert paths.work.join("dot").read() == "default\n"
+    assert paths.work.join("dir", "dotdot").read() == "default\n"
+
+    alternate = paths.work.join(f"alternate##os.{tst_sys}")
+    alternate.write("os")
+    run = runner(yadm_cmd("add", str(alternate)))
+    assert run.success
+    assert run.err == ""
+    assert paths.work.join("dot").read() == "os\n"
+    assert paths.work.join("dir", "dotdot").read() == "os\n"
+
+
+@pytest.mark.usefixtures("ds1_copy")
+@pytest.mark.parametrize(
+    "args, error",
+    [
+        (["-j"], "The -j option requires a number of jobs"),
+        (["--jobs", "many"], "Invalid number of jobs: many"),
+        (["-j", "0"], "Invalid number of jobs: 0"),
+        (["--unknown"], "Unknown option for alt: --unknown"),
+    ],
+    ids=["missing-jobs", "invalid-jobs", "zero-jobs", "unknown"],
+)
+def test_alt_invalid_options(runner, yadm_cmd, args, error):
+    """Test alt reports invalid options"""
+
+    run = runner(yadm_cmd("alt", *args))
+    assert run.failure
+    assert run.out == ""
+    assert f"ERROR: {error}" in run.err
+
+
+@pytest.mark.usefixtures("ds1_copy")
+def test_alt_cache(runner, yadm_cmd, paths):
+    """Test caching of resolved alternates"""
+
+    utils.create_alt_files(paths, "##default")
+    utils.create_alt_files(paths, "##class.testclass", preserve=True)
+    cached = "Using cached alternates"
+
+    run = runner(yadm_cmd("alt", "-d"))
+    assert run.success
+    assert run.err == ""
+    assert cached not in run.out
+    assert paths.data.join("alt-cache").isfile()
+    assert paths.work.join(utils.ALT_FILE1).read() == utils.ALT_FILE1 + "##default"
+
+    # nothing has changed, the cache is used
+    paths.work.join(utils.ALT_FILE1).remove()
+    run = runner(yadm_cmd("alt", "-d"))
+    assert run.success
+    assert run.err == ""
+    assert cached in run.out
+    assert paths.work.join(utils.ALT_FILE1).read() == utils.ALT_FILE1 + "##default"
+
+    # the cache is ignored when asked to
+    run = runner(yadm_cmd("alt", "-d", "--no-cache"))
+    assert run.success
+    assert run.err == ""
+    assert cached not in run.out
+
+    # a changed local value invalidates the cache
+    utils.set_local(paths, "class", "testclass")
+    run = runner(yadm_cmd("alt", "-d"))
+    assert run.success
+    assert run.err == ""
+    assert cached not in run.out
+    assert paths.work.join(utils.ALT_FILE1).read() == utils.ALT_FILE1 + "##class.testclass"
+
+    # a damaged cache is ignored
+    paths.data.join("alt-cache").write("damaged")
+    run = runner(yadm_cmd("alt", "-d"))
+    assert run.success
+    assert run.err == ""
+    assert cached not in run.out
+    assert paths.work.join(utils.ALT_FILE1).read() == utils.ALT_FILE1 + "##class.testclass"
+
+
+@pytest.mark.usefixtures("ds1_copy")
+def test_alt_cache_unsupported_template(runner, yadm_cmd, paths):
+    """Test missing template processors are reported when the cache is used"""
+
+    utils.create_alt_files(paths, "##template.unsupported")
+    message = "No supported template processor for template"
+
+    run = runner(yadm_cmd("alt"))
+    assert run.success
+    assert run.err == ""
+    assert message in run.out
+    assert paths.data.join("alt-cache").isfile()
+
+    run = runner(yadm_cmd("alt", "-d"))
+    assert run.success
+    assert "Using cached alternates" in run.out
+    assert message in run.out
@@ -29,11 +29,10 @@ def test_pdirs_missing(runner, yadm_cmd, paths, home):
     if home:
         env["HOME"] = paths.work
 
-    # run status
-    run = runner(command=yadm_cmd("status"), env=env)
+    # run checkout
+    run = runner(command=yadm_cmd("checkout"), env=env)
     assert run.success
     assert run.err == ""
-    assert "On branch master" in run.out
 
     # confirm directories are created
     # and are protected
@@ -48,10 +47,36 @@ def test_pdirs_missing(runner, yadm_cmd, paths, home):
     # confirm directories are created before command is run:
     if home:
         assert re.search(
-            r"Creating.+\.(gnupg|ssh).+Creating.+\.(gnupg|ssh).+Running git command git status", run.out, re.DOTALL
+            r"Creating.+\.(gnupg|ssh).+Creating.+\.(gnupg|ssh).+Running git command git checkout", run.out, re.DOTALL
         ), "directories created before command is run"
 
 
+def test_pdirs_missing_read_only(runner, yadm_cmd, paths):
+    """Private dirs (private dirs missing / read-only command)
+
+    When a read-only git command is run
+    And private directories are missing
+    Do not create private dirs
+    """
+
+    # confirm directories are missing at start
+    for pdir in PRIVATE_DIRS:
+        path = paths.work.join(pdir)
+        if path.exists():
+            path.remove()
+        assert not path.exists()
+
+    # run status
+    run = runner(command=yadm_cmd("status"), env={"HOME": paths.work})
+    assert run.success
+    assert run.err == ""
+    assert "On branch master" in run.out
+
+    # confirm directories are STILL missing
+    for pdir in PRIVATE_DIRS:
+        assert not paths.work.join(pdir).exists()
+
+
 def test_pdirs_missing_apd_false(runner, yadm_cmd, paths):
     """Private dirs (private dirs missing / yadm.auto-private-dirs=false)
 
@@ -71,11 +96,10 @@ def test_pdirs_missing_apd_false(runner, yadm_cmd, paths):
     # set configuration
     os.system(" ".join(yadm_cmd("config", "--bool", "yadm.auto-private-dirs", "false")))
 
-    # run status
-    run = runner(command=yadm_cmd("status"))
+    # run checkout
+    run = runner(command=yadm_cmd("checkout"))
     assert run.success
     assert run.err == ""
-    assert "On branch master" in run.out
 
     # confirm directories are STILL missing
     for pdir in PRIVATE_DIRS:
@@ -102,11 +126,10 @@ def test_pdirs_exist_apd_false(runner, yadm_cmd, paths):
     # set configuration
     os.system(" ".join(yadm_cmd("config", "--bool", "yadm.auto-perms", "false")))
 
-    # run status
-    run = runner(command=yadm_cmd("status"))
+    # run checkout
+    run = runner(command=yadm_cmd("checkout"))
     assert run.success
     assert run.err == ""
-    assert "On branch master" in run.out
 
     # created directories are STILL permissive
     for pdir in PRIVATE_DIRS:
@@ -0,0 +1,107 @@
+"""Test bundle"""
+
+import os
+
+import pytest
+
+
+@pytest.fixture()
+def remote(paths, ds1_repo_copy):
+    """Function scoped remote (based on ds1)"""
+    # pylint: disable=unused-argument
+    paths.remote.remove()
+    paths.repo.move(paths.remote)
+
+
+def repo_state(runner, paths):
+    """Return the configuration and refs of the yadm repo"""
+    state = []
+    for command in [("config", "--local", "--list"), ("for-each-ref",), ("symbolic-ref", "HEAD")]:
+        run = runner(command=("git", *command), env={"GIT_DIR": paths.repo})
+        assert run.success
+        state.append(run.out)
+    return state
+
+
+def count_objects(runner, paths):
+    """Return the number of loose objects in the yadm repo"""
+    run = runner(command=("git", "count-objects"), env={"GIT_DIR": paths.repo})
+    assert run.success
+    return run.out
+
+
+@pytest.mark.usefixtures("remote")
+@pytest.mark.parametrize("archive", [None, "tar", "files"], ids=["repo", "archive", "archive-files"])
+def test_bundle_clone(runner, paths, yadm_cmd, tmpdir, archive):
+    """Cloning a bundle creates the same state as cloning its origin"""
+
+    remote_url = f"file://{paths.remote}"
+    paths.work.remove()
+    paths.work.mkdir()
+    run = runner(command=yadm_cmd("clone", "-w", paths.work, remote_url))
+    assert run.success
+    cloned = repo_state(runner, paths)
+
+    args = ["bundle", "yadm.bundle"]
+    if archive == "tar":
+        paths.archive.write("encrypted data")
+    elif archive == "files":
+        paths.archive.join("key").write("encrypted key", ensure=True)
+        paths.archive.join("objects/0123abcd").write("encrypted data", ensure=True)
+    if archive:
+        args += ["--archive"]
+    objects = count_objects(runner, paths)
+    run = runner(command=yadm_cmd(*args), cwd=tmpdir)
+    assert run.success
+    assert run.err == ""
+    assert run.out == f"Created bundle {tmpdir}/yadm.bundle\n"
+    assert repo_state(runner, paths) == cloned
+    assert count_objects(runner, paths) == objects
+    assert not [path for path in paths.data.listdir() if path.basename.startswith("tmp.")]
+
+    # clone the bundle without access to the origin
+    os.rename(paths.remote, f"{paths.remote}.offline")
+    paths.work.remove()
+    paths.work.mkdir()
+    paths.repo.remove()
+    if archive:
+        paths.archive.remove(rec=1)
+    run = runner(command=yadm_cmd("clone", "-w", paths.work, "yadm.bundle"), cwd=tmpdir)
+    assert run.success
+    assert repo_state(runner, paths) == cloned
+    assert not paths.repo.join("FETCH_HEAD").exists()
+    if archive:
+        assert f"Restored {paths.archive} from bundle" in run.out
+        if archive == "tar":
+            assert paths.archive.read() == "encrypted data"
+        else:
+            assert paths.archive.join("key").read() == "encrypted key"
+            assert paths.archive.join("objects/0123abcd").read() == "encrypted data"
+    else:
+        assert not paths.archive.exists()
+
+    run = runner(command=yadm_cmd("ls-files", "--deleted"), cwd=paths.work)
+    assert run.success
+    assert run.out == ""
+
+
+@pytest.mark.usefixtures("ds1_repo_copy")
+def test_bundle_missing_archive(runner, yadm_cmd, tmpdir):
+    """The archive can only be bundled if it exists"""
+
+    run = runner(command=yadm_cmd("bundle", "--archive", "yadm.bundle"), cwd=tmpdir)
+    assert run.failure
+    assert "does not exist" in run.err
+    assert not tmpdir.join("yadm.bundle").exists()
+
+
+@pytest.mark.usefixtures("ds1_repo_copy")
+def test_bundle_git(runner, yadm_cmd, tmpdir):
+    """Git's bundle subcommands are passed through"""
+
+    run = runner(command=yadm_cmd("bundle", "create", "git.bundle", "--all"), cwd=tmpdir)
+    assert run.success
+    run = runner(command=yadm_cmd("bundle", "list-heads", "git.bundle"), cwd=tmpdir)
+    assert run.success
+    assert "refs/heads/master" in run.out
+    assert "refs/yadm/bundle" not in run.out
@@ -274,6 +274,117 @@ def test_clone_perms(runner, yadm_cmd, paths, repo_config, private_type, in_repo
     ), f".{private_type} has not been secured by auto.perms"
 
 
+@pytest.mark.usefixtures("remote")
+def test_clone_perms_query(runner, yadm_cmd, paths, repo_config, git_calls):
+    """Test tracked private directories are found by a single query"""
+
+    # track .ssh and a nested GNUPGHOME in the remote repo
+    gnupghome = paths.work.join(".config", "gnupg")
+    for private_dir in [paths.work.join(".ssh"), gnupghome]:
+        rpath = private_dir.join("related")
+        rpath.write("related", ensure=True)
+        os.system(f'GIT_DIR="{paths.remote}" git add {rpath}')
+    os.system(f'GIT_DIR="{paths.remote}" git commit -m "private dirs"')
+    paths.work.remove()
+    paths.work.mkdir()
+
+    env = {"HOME": paths.work, "GNUPGHOME": gnupghome}
+    run = runner(yadm_cmd("clone", "-d", "-w", paths.work, f"file://{paths.remote}"), env=env)
+
+    assert successful_clone(run, paths, repo_config)
+    for private_dir in [".ssh", ".config/gnupg"]:
+        assert f"Private directory {private_dir} is tracked by repo" in run.out
+        assert f"Creating {paths.work}/{private_dir}" in run.out
+    assert re.search(r"pre-checkout private dir perms drwx------.+\.ssh", run.out)
+    assert re.search(r"pre-checkout private dir perms drwx------.+\.config/gnupg", run.out)
+
+    commands = [call.split()[0] for call in git_calls.read().splitlines()]
+    assert commands.count("ls-tree") == 1
+    assert "log" not in commands
+
+
+@pytest.mark.usefixtures("remote")
+@pytest.mark.parametrize("option", ["--filter=blob:none", "--depth=1"])
+def test_clone_partial(runner, paths, yadm_cmd, repo_config, ds1, tmpdir, option):
+    """Test partial and shallow clones"""
+
+    # add history to the remote repo, and allow partial clones of it
+    history = paths.work.join("history")
+    for version in range(3):
+        history.write(f"version {version}")
+        os.system(f'GIT_DIR="{paths.remote}" git add {history}')
+        os.system(f'GIT_DIR="{paths.remote}" git commit -m "version {version}"')
+    os.system(f'GIT_DIR="{paths.remote}" git config uploadpack.allowFilter true')
+
+    # clear out the work path, except for one conflicting file
+    paths.work.remove()
+    paths.work.mkdir()
+    ds1.tracked[0].relative.write("conflict")
+
+    trace = tmpdir.join("trace")
+    run = runner(
+        command=yadm_cmd("clone", option, "-w", paths.work, f"file://{paths.remote}"),
+        env={"GIT_TRACE2_EVENT": str(trace)},
+    )
+    assert successful_clone(run, paths, repo_config)
+    verify_head(paths, "master")
+    assert "Local files with content that differs" in run.out
+    assert ds1.tracked[0].relative.read() == "conflict"
+    assert history.read() == "version 2"
+
+    run = runner(command=yadm_cmd("ls-files", "--deleted"), cwd=paths.work)
+    assert run.success
+    assert run.out == ""
+
+    if option.startswith("--filter"):
+        # blobs of earlier versions are not fetched, and those which are
+        # checked out are fetched by a single request
+        run = runner(
+            command=("git", "rev-list", "--objects", "--all", "--missing=print"),
+            env={"GIT_DIR": paths.repo},
+        )
+        assert run.success
+        assert re.search("^[?]", run.out, re.MULTILINE)
+        assert not re.search('"child_start".*"fetch"', trace.read())
+    else:
+        assert paths.repo.join("shallow").exists()
+
+
+@pytest.mark.usefixtures("remote")
+@pytest.mark.parametrize("shallow", [False, True], ids=["full", "shallow"])
+def test_clone_force_reuse(runner, paths, yadm_cmd, repo_config, tmpdir, shallow):
+    """Test objects of an existing repo are reused by clone -f"""
+
+    remote_url = f"file://{paths.remote}"
+    paths.work.remove()
+    paths.work.mkdir()
+    args = ["clone", "-w", paths.work]
+    if shallow:
+        args += ["--depth=1"]
+    run = runner(command=yadm_cmd(*args, remote_url))
+    assert successful_clone(run, paths, repo_config)
+
+    trace = tmpdir.join("trace")
+    run = runner(
+        command=yadm_cmd("clone", "-d", "-f", "-w", paths.work, remote_url),
+        env={"GIT_TRACE_PACKET": str(trace)},
+    )
+    assert successful_clone(run, paths, repo_config)
+    verify_head(paths, "master")
+    if shallow:
+        # git can't reuse objects of a shallow repo
+        assert "Reusing objects" not in run.out
+        assert "want " in trace.read()
+    else:
+        # all objects were already present, so none were fetched
+        assert "Reusing objects" in run.out
+        assert "want " not in trace.read()
+
+    # the existing repo is released
+    assert not paths.repo.join("objects", "info", "alternates").exists()
+    assert not [path for path in paths.data.listdir() if path.basename.startswith("tmp.")]
+
+
 @pytest.mark.usefixtures("remote")
 @pytest.mark.parametrize("branch", ["master", "default", "valid", "invalid"])
 def test_alternate_branch(runner, paths, yadm_cmd, repo_config, branch):
@@ -409,3 +520,25 @@ def test_clone_subdirectory(runner, paths, yadm_cmd, repo_config):
     assert run.success
     assert run.out == ""
     assert run.err == ""
+
+
+@pytest.mark.usefixtures("remote")
+def test_clone_checkout_batch(runner, paths, yadm_cmd, repo_config, ds1, git_calls):
+    """Test missing files are checked out by a single git command"""
+
+    # clear out the work path, except for one conflicting file
+    paths.work.remove()
+    paths.work.mkdir()
+    ds1.tracked[0].relative.write("conflict")
+
+    run = runner(command=yadm_cmd("clone", "-w", paths.work, f"file://{paths.remote}"))
+    assert successful_clone(run, paths, repo_config)
+    assert "Local files with content that differs" in run.out
+    assert ds1.tracked[0].relative.read() == "conflict"
+
+    checkouts = [call for call in git_calls.read().splitlines() if "checkout" in call.split()[:2]]
+    assert checkouts == ["--literal-pathspecs checkout --pathspec-from-file=- --pathspec-file-nul"]
+
+    run = runner(command=yadm_cmd("ls-files", "--deleted"), cwd=paths.work)
+    assert run.success
+    assert run.out == ""
@@ -411,6 +411,423 @@ def test_encrypt_added_to_exclude(runner, yadm_cmd, paths, gnupg):
     assert run.err == ""
 
 
+@pytest.mark.parametrize("cipher", ["gpg", "gpg-recipient", "openssl"])
+def test_files_format(request, runner, yadm_cmd, paths, encrypt_targets, gnupg, tmpdir, cipher):
+    """Test encrypting each file into its own object"""
+
+    gnupg.pw(PASSPHRASE)
+    env = os.environ.copy()
+    env["GNUPGHOME"] = gnupg.home
+
+    os.system(" ".join(yadm_cmd("config", "yadm.archive-format", "files")))
+    if cipher == "openssl":
+        use_openssl(yadm_cmd, tmpdir)
+    elif cipher == "gpg-recipient":
+        request.getfixturevalue("asymmetric_key")
+        os.system(" ".join(yadm_cmd("config", "yadm.gpg-recipient", KEY_NAME)))
+
+    paths.archive.write("existing tar archive")
+    run = runner(yadm_cmd("encrypt"), env=env)
+    assert run.success
+    assert f"Wrote {paths.archive} (5 of 5 files encrypted)" in run.out
+    assert sorted(os.listdir(paths.archive)) == ["key", "manifest", "objects"]
+    objects = archive_objects(paths.archive)
+    assert len(objects) == len(encrypt_targets)
+    # objects are named by an HMAC-SHA256 of the object id of their content
+    assert all(len(name) == 64 for name in objects)
+    if cipher == "gpg-recipient":
+        # the objects can also be decrypted with the key of the recipient
+        run = runner(["gpg", "-d", str(paths.archive.join("objects", next(iter(objects))))], env=env)
+        assert run.success
+    manifest = paths.archive.join("manifest").read_binary()
+
+    # only the changed file is encrypted again
+    paths.work.join("inc file1").write("changed")
+    run = runner(yadm_cmd("encrypt"), env=env)
+    assert run.success
+    assert f"Wrote {paths.archive} (1 of 5 files encrypted)" in run.out
+    changed = archive_objects(paths.archive)
+    assert len(changed) == len(encrypt_targets)
+    assert len(set(changed.items()) - set(objects.items())) == 1
+    assert paths.archive.join("manifest").read_binary() != manifest
+    manifest = paths.archive.join("manifest").read_binary()
+
+    # nothing is written if nothing changed
+    run = runner(yadm_cmd("encrypt", "-f"), env=env)
+    assert run.success
+    assert f"Wrote {paths.archive} (0 of 5 files encrypted)" in run.out
+    assert paths.archive.join("manifest").read_binary() == manifest
+
+    for filename in encrypt_targets:
+        paths.work.join(filename).remove()
+
+    run = runner(yadm_cmd("decrypt", "-l"), env=env)
+    assert run.success
+    for filename in encrypt_targets:
+        assert filename in run.out
+        assert not paths.work.join(filename).exists()
+
+    run = runner(yadm_cmd("decrypt"), env=env)
+    assert run.success
+    assert "All files decrypted." in run.out
+    for filename in encrypt_targets:
+        expected = "changed" if filename == "inc file1" else os.path.basename(filename)
+        assert paths.work.join(filename).read() == expected
+
+
+def test_files_format_link(runner, yadm_cmd, paths, encrypt_targets, gnupg):
+    """Test symbolic links are stored in the files format"""
+
+    gnupg.pw(PASSPHRASE)
+    env = os.environ.copy()
+    env["GNUPGHOME"] = gnupg.home
+
+    os.system(" ".join(yadm_cmd("config", "yadm.archive-format", "files")))
+    target = paths.work.join("inc link")
+    target.mksymlinkto("inc file1")
+    paths.encrypt.write("inc link\n", mode="a")
+
+    run = runner(yadm_cmd("encrypt"), env=env)
+    assert run.success
+    assert f"Wrote {paths.archive} (5 of 5 files encrypted)" in run.out
+
+    target.remove()
+    run = runner(yadm_cmd("decrypt"), env=env)
+    assert run.success
+    assert "inc link" in run.out
+    assert os.readlink(target) == "inc file1"
+
+    # an existing link is replaced
+    run = runner(yadm_cmd("decrypt"), env=env)
+    assert run.success
+    assert os.readlink(target) == "inc file1"
+
+
+@pytest.mark.parametrize(
+    "change",
+    [None, "touch", "content", "mode", "new", "archive", "settings", "force"],
+)
+def test_encrypt_unchanged(runner, yadm_cmd, paths, encrypt_targets, gnupg, change):
+    """Test skipping encryption if nothing changed"""
+
+    gnupg.pw(PASSPHRASE)
+    env = os.environ.copy()
+    env["GNUPGHOME"] = gnupg.home
+
+    # the first encryption is followed by making the files private
+    for _ in range(2):
+        run = runner(yadm_cmd("encrypt"), env=env)
+        assert run.success
+        assert f"Wrote new file: {paths.archive}" in run.out
+    assert paths.data.join("encrypt-manifest").exists()
+    archive = paths.archive.read_binary()
+
+    args = []
+    target = paths.work.join(encrypt_targets[0])
+    if change == "touch":
+        os.utime(target, (0, 0))
+    elif change == "content":
+        target.write("X" * len(target.read()))
+    elif change == "mode":
+        target.chmod(0o700)
+    elif change == "new":
+        paths.work.join("inc new").write("new")
+        paths.encrypt.write("inc new\n", mode="a")
+    elif change == "archive":
+        paths.archive.write("pulled archive")
+    elif change == "settings":
+        os.system(" ".join(yadm_cmd("config", "yadm.openssl-old", "true")))
+    elif change == "force":
+        args.append("-f")
+
+    run = runner(yadm_cmd("encrypt", *args), env=env)
+    assert run.success
+    assert run.err == ""
+    if change in (None, "touch"):
+        assert f"No encrypted files changed, {paths.archive} is up to date" in run.out
+        assert paths.archive.read_binary() == archive
+    else:
+        assert f"Wrote new file: {paths.archive}" in run.out
+        assert paths.archive.read_binary() != archive
+        run = runner(yadm_cmd("encrypt"), env=env)
+        assert run.success
+        assert "No encrypted files changed" in run.out
+
+
+@pytest.mark.parametrize("archive_format", ["tar", "files"])
+@pytest.mark.parametrize(
+    "args, cwd, restored",
+    [
+        (["inc file1"], "", ["inc file1"]),
+        (["globs*"], "", ["globs file1", "globs dir/globs file2"]),
+        (["inc dir"], "", ["inc dir/inc file2"]),
+        (["../extest/inglob1", "./inc file2"], "inc dir", ["extest/inglob1", "inc dir/inc file2"]),
+        ([".."], "inc dir", None),
+        (["missing"], "", []),
+    ],
+    ids=["file", "glob", "directory", "relative", "work", "missing"],
+)
+@pytest.mark.parametrize("dolist", [False, True], ids=["decrypt", "list"])
+def test_selective_decrypt(
+    runner, yadm_cmd, paths, encrypt_targets, gnupg, archive_format, args, cwd, restored, dolist
+):
+    """Test decrypting only the requested paths"""
+
+    gnupg.pw(PASSPHRASE)
+    env = os.environ.copy()
+    env["GNUPGHOME"] = gnupg.home
+
+    os.system(" ".join(yadm_cmd("config", "yadm.archive-format", archive_format)))
+    run = runner(yadm_cmd("encrypt"), env=env)
+    assert run.success
+    for filename in encrypt_targets:
+        paths.work.join(filename).remove()
+
+    if restored is None:
+        restored = encrypt_targets
+    if dolist:
+        args = ["-l"] + args
+    run = runner(yadm_cmd("decrypt", *args), cwd=paths.work.join(cwd), env=env)
+    if restored:
+        assert run.success
+    else:
+        assert run.failure
+        assert "missing: Not found in archive" in run.err
+    for filename in encrypt_targets:
+        assert (filename in run.out) == (filename in restored)
+        assert paths.work.join(filename).exists() == (filename in restored and not dolist)
+
+
+@pytest.mark.usefixtures("encrypt_targets")
+def test_decrypt_outside_work(runner, yadm_cmd, paths, gnupg):
+    """Test decrypting a path outside of the work tree"""
+
+    gnupg.pw(PASSPHRASE)
+    env = os.environ.copy()
+    env["GNUPGHOME"] = gnupg.home
+
+    run = runner(yadm_cmd("encrypt"), env=env)
+    assert run.success
+    run = runner(yadm_cmd("decrypt", "/elsewhere"), env=env)
+    assert run.failure
+    assert f"/elsewhere is outside of the work tree {paths.work}" in run.err
+
+
+@pytest.mark.parametrize("archive_format", ["tar", "files"])
+@pytest.mark.parametrize("archive_index", ["plain", "encrypted"])
+def test_archive_index(runner, yadm_cmd, paths, encrypt_targets, gnupg, archive_format, archive_index):
+    """Test listing files from the archive index"""
+
+    gnupg.pw(PASSPHRASE)
+    env = os.environ.copy()
+    env["GNUPGHOME"] = gnupg.home
+
+    index = paths.data.join("archive.index")
+    os.system(" ".join(yadm_cmd("config", "yadm.archive-format", archive_format)))
+    os.system(" ".join(yadm_cmd("config", "yadm.archive-index", archive_index)))
+    run = runner(yadm_cmd("encrypt"), env=env)
+    assert run.success
+    assert index.exists()
+    if archive_index == "plain":
+        lines = index.read().splitlines()
+        assert lines[0].startswith("yadm-archive-index 1 ")
+        assert sorted(line.split("\t")[1] for line in lines[1:]) == sorted(encrypt_targets)
+        assert all(line.split("\t")[0].endswith(" -") for line in lines[1:])
+        # the archive isn't decrypted
+        gnupg.pw("")
+    else:
+        assert "inc file1" not in index.read_binary().decode(errors="ignore")
+
+    run = runner(yadm_cmd("decrypt", "-d", "-l"), env=env)
+    assert run.success
+    assert f"Listed files from {index}" in run.out
+    for filename in encrypt_targets:
+        assert filename in run.out
+
+    # the files are listed the same way with or without the index
+    listed = runner(yadm_cmd("decrypt", "-l"), env=env).out
+    assert sorted(listed.splitlines()) == sorted(encrypt_targets)
+    gnupg.pw(PASSPHRASE)
+    index.rename(f"{index}.moved")
+    run = runner(yadm_cmd("decrypt", "-l"), env=env)
+    assert run.success
+    assert sorted(run.out.splitlines()) == sorted(listed.splitlines())
+    index.new(basename="archive.index.moved").rename(index)
+
+    run = runner(yadm_cmd("decrypt", "-l", "inc*"), cwd=paths.work, env=env)
+    assert run.success
+    assert run.out == "inc dir/inc file2\ninc file1\n"
+
+    # a stale index is ignored
+    gnupg.pw(PASSPHRASE)
+    stale = index.read_binary()
+    paths.work.join("inc file1").write("changed")
+    run = runner(yadm_cmd("encrypt"), env=env)
+    assert run.success
+    index.write_binary(stale)
+    run = runner(yadm_cmd("decrypt", "-d", "-l"), env=env)
+    assert run.success
+    assert f"Ignoring stale index {index}" in run.out
+    for filename in encrypt_targets:
+        assert filename in run.out
+
+    # the index is removed if it's no longer configured
+    os.system(" ".join(yadm_cmd("config", "--unset", "yadm.archive-index")))
+    run = runner(yadm_cmd("encrypt"), env=env)
+    assert run.success
+    assert not index.exists()
+
+
+@pytest.mark.parametrize("cipher", ["gpg", "openssl"])
+@pytest.mark.parametrize(
+    "compression, magic",
+    [
+        (None, "75 73 74 61 72"),
+        ("none", "75 73 74 61 72"),
+        ("gzip:9", "1f 8b"),
+        ("zstd:3:2", "28 b5 2f fd"),
+        ("xz::2", "fd 37 7a 58 5a 00"),
+    ],
+)
+def test_archive_compression(runner, yadm_cmd, paths, encrypt_targets, gnupg, tmpdir, cipher, compression, magic):
+    """Test compressing the archive before it's encrypted"""
+
+    gnupg.pw(PASSPHRASE)
+    env = os.environ.copy()
+    env["GNUPGHOME"] = gnupg.home
+
+    if compression:
+        os.system(" ".join(yadm_cmd("config", "yadm.archive-compression", compression)))
+    if cipher == "openssl":
+        openssl = use_openssl(yadm_cmd, tmpdir)
+        decrypt = [str(openssl), "enc", "-d", "-aes-256-cbc", "-pbkdf2", "-iter", "100000", "-md", "sha512", "-in"]
+    else:
+        decrypt = ["gpg", "-d"]
+    run = runner(yadm_cmd("encrypt"), env=env)
+    assert run.success
+    assert f"Wrote new file: {paths.archive}" in run.out
+
+    # the decrypted archive starts with the magic number of the codec, or is
+    # a tar file ("ustar" at offset 257)
+    offset = 257 if magic.startswith("75") else 0
+    run = runner(
+        [*decrypt, shlex.quote(str(paths.archive)), "2>/dev/null", "|"]
+        + ["od", "-An", "-v", "-tx1", "-j", str(offset), "-N", str(len(magic.split()))],
+        env=env,
+        shell=True,
+        report=False,
+    )
+    assert run.out.strip() == magic
+
+    for filename in encrypt_targets:
+        paths.work.join(filename).remove()
+    run = runner(yadm_cmd("decrypt"), env=env)
+    assert run.success
+    assert "All files decrypted." in run.out
+    for filename in encrypt_targets:
+        assert paths.work.join(filename).read() == os.path.basename(filename)
+
+
+@pytest.mark.parametrize("compression", ["lz4", "gzip:1:2", "zstd:x"])
+def test_archive_compression_invalid(runner, yadm_cmd, paths, gnupg, compression):
+    """Test an invalid archive compression"""
+
+    gnupg.pw(PASSPHRASE)
+    env = os.environ.copy()
+    env["GNUPGHOME"] = gnupg.home
+
+    paths.encrypt.write("*.txt\n")
+    os.system(" ".join(yadm_cmd("config", "yadm.archive-compression", compression)))
+    run = runner(yadm_cmd("encrypt"), env=env)
+    assert run.failure
+    assert run.out == ""
+    assert run.err
+    assert not paths.archive.exists()
+
+
+@pytest.mark.parametrize("cipher", ["gpg", "openssl"])
+def test_archive_shards(runner, yadm_cmd, paths, encrypt_targets, gnupg, tmpdir, cipher):
+    """Test encrypting the archive in shards"""
+
+    gnupg.pw(PASSPHRASE)
+    env = os.environ.copy()
+    env["GNUPGHOME"] = gnupg.home
+
+    os.system(" ".join(yadm_cmd("config", "yadm.archive-shards", "3")))
+    os.system(" ".join(yadm_cmd("config", "yadm.archive-compression", "gzip")))
+    if cipher == "openssl":
+        openssl = use_openssl(yadm_cmd, tmpdir)
+        # record when the shards are encrypted, which happens in parallel
+        log = tmpdir.join("log")
+        wrapper = openssl.read().replace(
+            "#!/bin/sh\n",
+            f'#!/bin/sh\ncase "$*" in "enc -e "*fd:3*) echo start >> {log}; sleep 0.5; echo end >> {log};; esac\n',
+        )
+        openssl.write(wrapper)
+
+    paths.archive.write("existing tar archive")
+    run = runner(yadm_cmd("encrypt"), env=env)
+    assert run.success
+    assert f"Wrote {paths.archive} (3 shards)" in run.out
+    assert sorted(os.listdir(paths.archive)) == ["key", "manifest", "shards"]
+    assert sorted(os.listdir(paths.archive.join("shards"))) == ["1", "2", "3"]
+    if cipher == "openssl":
+        # the shards and the manifest are encrypted at the same time
+        assert log.read().splitlines()[:4] == ["start"] * 4
+
+    for filename in encrypt_targets:
+        paths.work.join(filename).remove()
+
+    run = runner(yadm_cmd("decrypt", "-l"), env=env)
+    assert run.success
+    for filename in encrypt_targets:
+        assert filename in run.out
+        assert not paths.work.join(filename).exists()
+
+    run = runner(yadm_cmd("decrypt", "inc*"), cwd=paths.work, env=env)
+    assert run.success
+    assert "Requested files decrypted." in run.out
+    for filename in encrypt_targets:
+        assert paths.work.join(filename).exists() == filename.startswith("inc")
+
+    run = runner(yadm_cmd("decrypt", "missing"), cwd=paths.work, env=env)
+    assert run.failure
+    assert "missing: Not found in archive" in run.err
+
+    run = runner(yadm_cmd("decrypt"), env=env)
+    assert run.success
+    assert "All files decrypted." in run.out
+    for filename in encrypt_targets:
+        assert paths.work.join(filename).read() == os.path.basename(filename)
+
+    # a single shard is written as a tar archive
+    os.system(" ".join(yadm_cmd("config", "yadm.archive-shards", "1")))
+    run = runner(yadm_cmd("encrypt"), env=env)
+    assert run.success
+    assert paths.archive.isfile()
+
+
+def use_openssl(yadm_cmd, tmpdir):
+    """Configure the openssl cipher, using a wrapper which adds the passphrase"""
+    # openssl would ask for the passphrase of the key on the tty
+    openssl = tmpdir.join("openssl")
+    openssl.write(
+        "#!/bin/sh\n"
+        'case "$*" in *-pass\\ *|rand\\ *|dgst\\ *) exec openssl "$@";; esac\n'
+        f'exec openssl "$@" -pass pass:{PASSPHRASE}\n'
+    )
+    openssl.chmod(0o755)
+    os.system(" ".join(yadm_cmd("config", "yadm.cipher", "openssl")))
+    os.system(" ".join(yadm_cmd("config", "yadm.openssl-program", str(openssl))))
+    return openssl
+
+
+def archive_objects(archive):
+    """Return the content of each object of an archive in the files format"""
+    objects = archive.join("objects")
+    return {obj: objects.join(obj).read_binary() for obj in os.listdir(objects)}
+
+
 def encrypted_data_valid(runner, gnupg, encrypted, expected):
     """Verify encrypted data matches expectations"""
     gnupg.pw(PASSPHRASE)
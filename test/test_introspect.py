@@ -10,6 +10,7 @@ import pytest
         "invalid",
         "commands",
         "configs",
+        "facts",
         "repo",
         "switches",
     ],
@@ -37,6 +38,16 @@ def test_introspect_category(runner, yadm_cmd, paths, name, supported_commands,
         assert run.out == ""
     if name == "repo":
         assert run.out.rstrip() == paths.repo
+    if name == "facts":
+        assert [line.split("=")[0] for line in run.out.splitlines()] == [
+            "arch",
+            "cygpath",
+            "distro",
+            "distro-family",
+            "hostname",
+            "os",
+            "user",
+        ]
 
     # make sure every expected value is present
     for value in expected:
@@ -0,0 +1,105 @@
+"""Unit tests: config_from_snapshot"""
+
+import pytest
+
+CONFIG = """
+[test]
+    flag
+    empty =
+    multi = one
+    multi = two
+    yes = Yes
+    off = OFF
+    zero = 0
+    number = 42
+    negative = -7
+    hex = 0x10
+    unit = 2k
+    invalid = maybe
+    mixed = maybe
+    mixed = true
+[test "sub"]
+    key = value
+"""
+
+LOOKUPS = [
+    "test.flag",
+    "--bool test.flag",
+    "--int test.flag",
+    "--get-all test.flag",
+    "test.empty",
+    "--bool test.empty",
+    "--int test.empty",
+    "test.multi",
+    "--get-all test.multi",
+    "--bool test.yes",
+    "--bool test.off",
+    "--bool test.zero",
+    "--int test.number",
+    "--bool test.number",
+    "--int test.negative",
+    "--int test.hex",
+    "--bool test.unit",
+    "--bool test.invalid",
+    "--bool test.mixed",
+    "test.missing",
+    "--get-all test.missing",
+    "--bool test.missing",
+    "TEST.MULTI",
+    "test.sub.key",
+]
+
+
+@pytest.mark.parametrize("lookup", LOOKUPS)
+def test_config_from_snapshot(runner, yadm, tmpdir, lookup):
+    """Lookups give the same output and status as git"""
+
+    config = tmpdir.join("config")
+    config.write(CONFIG)
+
+    script = f"""
+        YADM_TEST=1 source {yadm}
+        YADM_CONFIG={config}
+        git config --file={config} {lookup}
+        echo "status:$?"
+        echo "---"
+        config {lookup}
+        echo "status:$?"
+    """
+    run = runner(command=["bash"], inp=script)
+    expected, actual = run.out.split("---\n")
+    assert actual == expected
+
+
+def test_config_snapshot_git_calls(runner, yadm, tmpdir):
+    """Many lookups require a single git command, writes clear the snapshot"""
+
+    config = tmpdir.join("config")
+    config.write(CONFIG)
+    calls = tmpdir.join("calls")
+    git = tmpdir.join("git")
+    git.write(f'#!/bin/sh\necho "$*" >> {calls}\nexec git "$@"\n')
+    git.chmod(0o755)
+
+    script = f"""
+        YADM_TEST=1 source {yadm}
+        GIT_PROGRAM={git}
+        YADM_CONFIG={config}
+        load_config_snapshot yadm
+        echo "$(config test.multi)"
+        echo "$(config --bool test.yes)"
+        echo "$(config --get-all test.multi)"
+        config test.number 43
+        load_config_snapshot yadm
+        echo "$(config --int test.number)"
+        config --int test.number
+    """
+    run = runner(command=["bash"], inp=script)
+    assert run.success
+    assert run.err == ""
+    assert run.out == "two\ntrue\none\ntwo\n43\n43\n"
+    assert calls.read().splitlines() == [
+        f"config --file={config} --list -z",
+        f"config --file={config} test.number 43",
+        f"config --file={config} --list -z",
+    ]
@@ -1,5 +1,10 @@
 """Unit tests: encryption functions"""
 
+import hashlib
+import hmac
+import os
+import shutil
+
 import pytest
 
 
@@ -61,6 +66,127 @@ def test_encrypt_decrypt(runner, paths, cipher, mode):
         assert "Unknown cipher" in run.err
 
 
+@pytest.mark.parametrize("cipher", ["gpg", "openssl"])
+@pytest.mark.parametrize("mode", ["_encrypt_to", "_decrypt_from"])
+def test_encrypt_decrypt_key(runner, paths, cipher, mode):
+    """Test _encrypt_to() & _decrypt_from with a key"""
+
+    script = f"""
+        YADM_TEST=1 source {paths.pgm}
+        YADM_DIR="{paths.yadm}"
+        set_yadm_dirs
+        configure_paths
+        function mock_openssl() {{ echo openssl $*; cat <&3; }}
+        function mock_gpg() {{ echo gpg $*; cat <&3; }}
+        function _get_cipher() {{
+            output_archive="$1"
+            yadm_cipher="{cipher}"
+        }}
+        OPENSSL_PROGRAM=mock_openssl
+        GPG_PROGRAM=mock_gpg
+        {mode} {paths.archive} secret-key
+    """
+    run = runner(command=["bash"], inp=script)
+
+    assert run.success
+    assert run.err == ""
+    assert run.out.startswith(cipher)
+    assert str(paths.archive) in run.out
+    if cipher == "gpg":
+        assert "--batch" in run.out
+        assert "--passphrase-fd 3" in run.out
+    else:
+        assert "-pass fd:3" in run.out
+    assert run.out.endswith("secret-key")
+
+
+@pytest.mark.parametrize("key", ["", "secret-key"], ids=["no_key", "key"])
+@pytest.mark.parametrize("compression", ["", "none:3", "zstd:19"])
+def test_encrypt_compressed(runner, paths, key, compression):
+    """Test gpg only skips compression for data compressed by yadm"""
+
+    script = f"""
+        YADM_TEST=1 source {paths.pgm}
+        YADM_DIR="{paths.yadm}"
+        set_yadm_dirs
+        configure_paths
+        function mock_gpg() {{ echo gpg $*; }}
+        GPG_PROGRAM=mock_gpg
+        _encrypt_to {paths.archive} "{key}" "{compression}"
+    """
+    run = runner(command=["bash"], inp=script)
+
+    assert run.success
+    assert run.err == ""
+    if compression.startswith("zstd"):
+        assert "--compress-algo none --output" in run.out
+    else:
+        assert "--compress-algo" not in run.out
+
+
+def test_decompress_missing(runner, paths, tmpdir):
+    """Test _decompress fails clearly if the codec isn't installed"""
+
+    bin_dir = tmpdir.mkdir("bin")
+    for program in ("cat", "dd", "od"):
+        os.symlink(shutil.which(program), bin_dir.join(program))
+
+    script = f"""
+        YADM_TEST=1 source {paths.pgm}
+        PATH={bin_dir}
+        printf '\\x28\\xb5\\x2f\\xfd\\x00\\x00' | _decompress
+    """
+    run = runner(command=["bash"], inp=script)
+
+    assert run.failure
+    assert "requires zstd to be installed" in run.err
+
+
+@pytest.mark.parametrize("recipient", ["ASK", "present", ""])
+def test_encrypt_key_recipient(runner, paths, recipient):
+    """Test _encrypt_to() with a key also encrypts for configured recipients"""
+
+    paths.config.write(f"[yadm]\n\tgpg-recipient = {recipient}")
+
+    script = f"""
+        YADM_TEST=1 source {paths.pgm}
+        YADM_DIR="{paths.yadm}"
+        set_yadm_dirs
+        configure_paths
+        function mock_gpg() {{ echo gpg $*; }}
+        GPG_PROGRAM=mock_gpg
+        _encrypt_to {paths.archive} secret-key
+    """
+    run = runner(command=["bash"], inp=script)
+
+    assert run.success
+    assert run.err == ""
+    if recipient == "present":
+        assert "--passphrase-fd 3 -c -e -r present --output" in run.out
+    else:
+        assert "--passphrase-fd 3 -c --output" in run.out
+
+
+@pytest.mark.parametrize("key", ["a" * 64, "0123456789abcdef", "6" * 64], ids=["block", "short", "zero-pad"])
+def test_hmac_lines(runner, paths, tmpdir, key):
+    """Test _hmac_lines() computes an HMAC-SHA256 without giving openssl the key"""
+
+    calls = tmpdir.join("calls")
+    script = f"""
+        YADM_TEST=1 source {paths.pgm}
+        function mock_openssl() {{ echo "$*" >> {calls}; openssl "$@"; }}
+        OPENSSL_PROGRAM=mock_openssl
+        printf 'first\\nsecond line\\n' | _hmac_lines {key}
+    """
+    run = runner(command=["bash"], inp=script)
+
+    assert run.success
+    assert run.err == ""
+    expected = [hmac.new(key.encode(), message, hashlib.sha256).hexdigest() for message in (b"first", b"second line")]
+    assert [line.split(" ")[0] for line in run.out.splitlines()] == expected
+    assert key not in calls.read()
+
+
 @pytest.mark.parametrize("condition", ["default", "override"])
 def test_get_openssl_ciphername(runner, paths, condition):
     """Test _get_openssl_ciphername()"""
@@ -0,0 +1,106 @@
+"""Unit tests: set_host_facts"""
+
+import os
+
+import pytest
+import utils
+
+
+@pytest.mark.parametrize(
+    "change",
+    [None, "os-release", "proc-version", "hostname", "lsb_release"],
+)
+def test_set_host_facts(runner, yadm, tmpdir, tst_arch, tst_host, tst_user, change):
+    """Facts are cached until something they depend upon changes"""
+
+    data = tmpdir.mkdir("data")
+    os_release = tmpdir.join("os-release")
+    os_release.write('ID="testdistro"\nID_LIKE="testfamily"\n')
+    proc_version = tmpdir.join("proc_version")
+    proc_version.write("test version")
+    lsb_release = tmpdir.join("lsb_release")
+    calls = tmpdir.join("calls")
+
+    script = f"""
+        YADM_TEST=1 source {yadm}
+        YADM_DATA={data}
+        OS_RELEASE={os_release}
+        PROC_VERSION={proc_version}
+        LSB_RELEASE_PROGRAM={lsb_release}
+        function uname() {{ echo "uname $*" >> {calls}; command uname "$@"; }}
+        function id() {{ echo "id $*" >> {calls}; command id "$@"; }}
+        set_host_facts
+    """
+    run = runner(command=["bash"], inp=script + "introspect_facts")
+    assert run.success
+    assert run.err == ""
+    facts = run.out
+    assert f"arch={tst_arch}\n" in facts
+    assert "distro=testdistro\n" in facts
+    assert "distro-family=testfamily\n" in facts
+    assert f"hostname={tst_host}\n" in facts
+    assert f"user={tst_user}\n" in facts
+    stamp, cached = data.join("facts").read().split("\n", 1)
+    assert stamp.startswith("stamp=")
+    assert cached == facts
+    assert calls.read() != ""
+    calls.remove()
+
+    if change == "os-release":
+        os_release.write('ID="newdistro"\n')
+        os.utime(data.join("facts"), (0, 0))
+    elif change == "proc-version":
+        os.utime(data.join("facts"), (0, 0))
+    elif change == "hostname":
+        script = "HOSTNAME=changed\n" + script
+    elif change == "lsb_release":
+        lsb_release.write("#!/bin/sh\necho lsbdistro\n")
+        lsb_release.chmod(0o755)
+
+    run = runner(command=["bash"], inp=script + "introspect_facts")
+    assert run.success
+    assert run.err == ""
+    if change is None:
+        assert run.out == facts
+        assert not calls.exists()
+    else:
+        assert calls.exists()
+        if change == "os-release":
+            assert "distro=newdistro\n" in run.out
+        elif change == "lsb_release":
+            assert "distro=lsbdistro\n" in run.out
+
+
+@pytest.mark.parametrize("override", [False, True], ids=["no-override", "override"])
+@pytest.mark.usefixtures("ds1_copy")
+def test_host_distro(runner, yadm, paths, tmpdir, override):
+    """The distro is only queried if it isn't overridden, then cached"""
+
+    lsb_release = tmpdir.join("lsb_release")
+    lsb_release.write(f"#!/bin/sh\necho called >> {tmpdir.join('calls')}\necho lsbdistro\n")
+    lsb_release.chmod(0o755)
+    if override:
+        utils.set_local(paths, "distro", "override")
+
+    script = f"""
+        YADM_TEST=1 source {yadm}
+        YADM_DIR={paths.yadm}
+        YADM_DATA={paths.data}
+        LSB_RELEASE_PROGRAM={lsb_release}
+        set_host_facts
+        configure_paths
+        set_local_alt_values
+        echo "distro=$local_distro"
+    """
+    for _ in range(2):
+        run = runner(command=["bash"], inp=script)
+        assert run.success
+        assert run.err == ""
+        if override:
+            assert run.out == "distro=override\n"
+            assert not tmpdir.join("calls").exists()
+            assert "distro=" not in paths.data.join("facts").read().replace("distro-family=", "")
+        else:
+            assert run.out == "distro=lsbdistro\n"
+            assert tmpdir.join("calls").read() == "called\n"
+            assert "distro=lsbdistro\n" in paths.data.join("facts").read()
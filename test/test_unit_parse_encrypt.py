@@ -1,5 +1,8 @@
 """Unit tests: parse_encrypt"""
 
+import os
+import time
+
 import pytest
 
 
@@ -171,7 +174,140 @@ def test_file_parse_encrypt(runner, paths):
     assert sorted_expectations in run.out
 
 
-def run_parse_encrypt(runner, paths, skip_parse=False, twice=False):
+@pytest.mark.usefixtures("ds1_repo_copy")
+@pytest.mark.parametrize("matchable", [True, False], ids=["matchable", "unmatchable"])
+def test_unmatchable_patterns(runner, paths, tmpdir, matchable):
+    """Test parse_encrypt leaves out patterns which can't match any file"""
+
+    unmatchable = ["missing_file", "missing_dir/*", "missing_dir/**/file", "simple_file/*"]
+    edata = "".join(f"{pattern}\n" for pattern in unmatchable)
+    expected = []
+    if matchable:
+        edata += "dir/*\nsimple_file\n"
+        paths.work.join("dir/file").write("", ensure=True)
+        expected = ["dir/file", "simple_file"]
+    paths.work.join("simple_file").write("")
+    paths.encrypt.write(edata)
+
+    log = tmpdir.join("log")
+    git = tmpdir.join("git")
+    git.write(f'#!/bin/sh\necho "$*" >> {log}\nexec git "$@"\n')
+    git.chmod(0o755)
+
+    run = run_parse_encrypt(runner, paths, git_program=git)
+    assert run.success
+    assert run.err == ""
+    assert f"EIF_COUNT:{len(expected)}" in run.out
+    for expected_file in expected:
+        assert f"EIF:{expected_file}\n" in run.out
+    if matchable:
+        assert log.read() == "--glob-pathspecs ls-files --others -- dir/* simple_file\n"
+    else:
+        assert not log.exists()
+
+
+@pytest.mark.usefixtures("ds1_repo_copy")
+@pytest.mark.parametrize("whole", [False, True], ids=["prefixed", "whole-tree"])
+def test_dot_slash_patterns(runner, paths, tmpdir, whole):
+    """Test parse_encrypt strips a leading "./" from patterns
+
+    Patterns starting with "./" are matched like the same pattern without it;
+    "./" and "." match the whole work tree, which can't be cached.
+    """
+
+    edata = "./missing_dir/*\n././dir/*\n./simple_file\n"
+    if whole:
+        edata += "./\n"
+    paths.work.join("dir/file").write("", ensure=True)
+    paths.work.join("simple_file").write("")
+    paths.encrypt.write(edata)
+
+    # the directories scanned must be older than the scan to be cached
+    old = time.time() - 10
+    for path in [paths.work, paths.work.join("dir"), paths.repo.join("index")]:
+        os.utime(path, (old, old))
+
+    log = tmpdir.join("log")
+    git = tmpdir.join("git")
+    git.write(f'#!/bin/sh\necho "$*" >> {log}\nexec git "$@"\n')
+    git.chmod(0o755)
+
+    run = run_parse_encrypt(runner, paths, git_program=git)
+    assert run.success
+    assert run.err == ""
+    assert "EIF:dir/file\n" in run.out
+    assert "EIF:simple_file\n" in run.out
+    scan = "././dir/* ./simple_file"
+    if whole:
+        scan += " ./"
+    assert f"ls-files --others -- {scan}\n" in log.read()
+    assert paths.data.join("encrypt-cache").exists() != whole
+
+
+@pytest.mark.usefixtures("ds1_repo_copy")
+@pytest.mark.parametrize(
+    "change",
+    [None, "new", "nested", "removed", "missing", "patterns", "index"],
+)
+def test_encrypt_cache(runner, paths, tmpdir, change):
+    """Test parse_encrypt only scans again if something changed"""
+
+    paths.encrypt.write("secret/*\nsecret/**/key*\nmissing/*\n")
+    secret = paths.work.join("secret")
+    secret.join("a").write("", ensure=True)
+    secret.join("b").write("", ensure=True)
+    secret.join("sub/key1").write("", ensure=True)
+    expected = {"secret/a", "secret/b", "secret/sub/key1"}
+
+    # the directories scanned must be older than the scan to be cached
+    old = time.time() - 10
+    for path in [paths.work, secret, secret.join("sub"), paths.repo.join("index")]:
+        os.utime(path, (old, old))
+
+    log = tmpdir.join("log")
+    git = tmpdir.join("git")
+    git.write(f'#!/bin/sh\necho "$*" >> {log}\nexec git "$@"\n')
+    git.chmod(0o755)
+
+    run = run_parse_encrypt(runner, paths, git_program=git)
+    assert run.success
+    assert "ls-files --others" in log.read()
+    assert paths.data.join("encrypt-cache").exists()
+    log.remove()
+
+    if change == "new":
+        secret.join("c").write("")
+        expected.add("secret/c")
+    elif change == "nested":
+        secret.join("sub/key2").write("")
+        expected.add("secret/sub/key2")
+    elif change == "removed":
+        secret.join("b").remove()
+        expected.remove("secret/b")
+    elif change == "missing":
+        paths.work.join("missing/file").write("", ensure=True)
+        expected.add("missing/file")
+    elif change == "patterns":
+        paths.encrypt.write("secret/*\n")
+        expected.remove("secret/sub/key1")
+    elif change == "index":
+        env = {"GIT_DIR": str(paths.repo), "GIT_WORK_TREE": str(paths.work)}
+        assert runner(command=["git", "add", "secret/a"], cwd=paths.work, env=env).success
+        expected.remove("secret/a")
+
+    run = run_parse_encrypt(runner, paths, git_program=git)
+    assert run.success
+    assert run.err == ""
+    assert f"EIF_COUNT:{len(expected)}" in run.out
+    for expected_file in expected:
+        assert f"EIF:{expected_file}\n" in run.out
+    if change is None:
+        assert not log.exists()
+    else:
+        assert "ls-files --others" in log.read()
+
+
+def run_parse_encrypt(runner, paths, skip_parse=False, twice=False, git_program="git"):
     """Run parse_encrypt
 
     A count of ENCRYPT_INCLUDE_FILES will be reported as EIF_COUNT:X. All
@@ -191,6 +327,8 @@ def run_parse_encrypt(runner, paths, skip_parse=False, twice=False):
         export GIT_DIR
         YADM_WORK={paths.work}
         export YADM_WORK
+        GIT_PROGRAM={git_program}
+        YADM_ENCRYPT_CACHE={paths.data}/encrypt-cache
         {parse_cmd}
         echo PARSE_ENCRYPT_SHORT=$PARSE_ENCRYPT_SHORT
         echo EIF_COUNT:${{#ENCRYPT_INCLUDE_FILES[@]}}
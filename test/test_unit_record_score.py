@@ -12,6 +12,7 @@ INIT_VARS = """
     alt_targets=()
     alt_sources=()
     alt_template_processors=()
+    declare -A alt_target_index=()
 """
 
 REPORT_RESULTS = """
@@ -187,3 +188,34 @@ def test_overwrite_existing_template(runner, yadm):
     assert "TARGETS:testtgt\n" in run.out
     assert "SOURCES:new_src\n" in run.out
     assert "TEMPLATE_PROCESSORS:new_processor\n" in run.out
+
+
+@pytest.mark.usefixtures("ds1_copy")
+def test_scaling(runner, yadm_cmd, paths):
+    """The work done per alternate must not grow with the number of alternates
+
+    "yadm alt" is traced, and the commands run by record_score and in_list
+    are counted. Looking up each target with a scan of alt_targets makes the
+    count grow quadratically with the number of alternates.
+    """
+
+    # PS4 is not imported from the environment when running as root
+    trace = ["bash", "-c", 'PS4=\'+${FUNCNAME[0]}:\'; set -x; . "$0" "$@"']
+    traced = {}
+    for count in (20, 200):
+        for index in range(count):
+            paths.work.join(f"scaling/file{index}##default").write("default", ensure=True)
+        run = runner(yadm_cmd("add", str(paths.work.join("scaling"))))
+        assert run.success
+
+        run = runner(trace + yadm_cmd("alt", "--no-cache"), report=False)
+        assert run.success
+        assert f"scaling/file{count - 1}" in run.out
+        traced[count] = sum(
+            1 for line in run.err.splitlines() if line.lstrip("+").startswith(("record_score:", "in_list:"))
+        )
+
+    assert traced[20] > 0
+    # 10 times as many alternates, a linear scan of alt_targets per alternate
+    # would run about 100 times as many commands
+    assert traced[200] < traced[20] * 15
@@ -1,5 +1,7 @@
 """Unit tests: relative_path"""
 
+import os
+
 import pytest
 
 
@@ -35,3 +37,62 @@ def test_relative_path(runner, paths, base, full_path, expected):
     assert run.success
     assert run.err == ""
     assert run.out.strip() == expected
+
+
+@pytest.mark.parametrize(
+    "base,full_path,expected",
+    [
+        ("/A/B/C", "/A", "../.."),
+        ("/A/B/C", "/A/B/C", ""),
+        ("/A/B/C", "/A/B/C/D/E", "D/E"),
+        ("/A/B/C", "/D/E/F", "../../../D/E/F"),
+        ("/", "/A/B/C", "A/B/C"),
+    ],
+)
+def test_relative_path_variable(runner, paths, base, full_path, expected):
+    """Test relative_path assigning the result to a variable"""
+
+    script = f"""
+        YADM_TEST=1 source {paths.pgm}
+        relative_path "{base}" "{full_path}" relative
+        echo "[$relative]"
+    """
+
+    run = runner(command=["bash"], inp=script)
+    assert run.success
+    assert run.err == ""
+    assert run.out == f"[{expected}]\n"
+
+
+def test_ln_relative_many(runner, paths, tmpdir):
+    """Test linking 10k alternates across deep trees, without subshells"""
+
+    links = []
+    for tree in range(10):
+        for depth in range(10):
+            target_dir = "/".join(["/work", f"tree{tree}"] + [f"d{d}" for d in range(depth)])
+            for name in range(100):
+                target = f"{target_dir}/file{name}"
+                if name % 10 == 0:
+                    source = f"/work/alt{tree}##os.Test/d{depth}/file{name}"
+                else:
+                    source = f"{target}##os.Test"
+                links.append((source, target))
+    tmpdir.join("links").write("".join(f"{s}\n{t}\n" for s, t in links))
+
+    script = f"""
+        YADM_TEST=1 source {paths.pgm}
+        function ln() {{ :; }}
+        alt_linked=()
+        ((USE_ASSOC)) && declare -A relative_prefixes=()
+        while read -r source && read -r target; do
+          ln_relative "$source" "$target"
+        done < {tmpdir.join("links")}
+        printf '%s\\n' "${{alt_linked[@]}}"
+    """
+
+    run = runner(command=["bash"], inp=script)
+    assert run.success
+    assert run.err == ""
+    expected = [os.path.relpath(s, os.path.dirname(t)) for s, t in links]
+    assert run.out.splitlines() == expected
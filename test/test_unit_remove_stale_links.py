@@ -37,3 +37,43 @@ def test_remove_stale_links(runner, yadm, tmpdir, kind, linked):
         assert f"rm -f {link}" in run.out
     else:
         assert run.out == ""
+
+
+@pytest.mark.parametrize("batch", [True, False], ids=["batch", "single"])
+def test_remove_stale_links_readlink(runner, yadm, tmpdir, batch):
+    """Test links are resolved using a single readlink when possible"""
+
+    links = []
+    for name in ["stale1", "stale2", "linked1", "linked2"]:
+        link = tmpdir.join(name)
+        os.symlink(f"source_{name}", link)
+        links.append(str(link))
+    regular = tmpdir.join("regular")
+    regular.write("regular file")
+    links.append(str(regular))
+    links.append(str(tmpdir.join("missing")))
+
+    # readlink which only supports a single file, like the one in busybox
+    fail = "" if batch else '[ "$#" -gt 2 ] && return 1'
+
+    script = f"""
+        YADM_TEST=1 source {yadm}
+        possible_alt_targets=({" ".join(links)})
+        alt_linked=(source_linked1 source_linked2)
+        function rm() {{ echo rm "$@"; }}
+        function readlink() {{
+          echo "$#" >> {tmpdir}/calls
+          {fail}
+          command readlink "$@"
+        }}
+        remove_stale_links
+    """
+
+    run = runner(command=["bash"], inp=script)
+    assert run.err == ""
+    assert run.out == f"rm -f {tmpdir}/stale1\nrm -f {tmpdir}/stale2\n"
+    calls = tmpdir.join("calls").read().split()
+    if batch:
+        assert calls == ["5"]
+    else:
+        assert calls == ["5", "1", "1", "1", "1"]
@@ -0,0 +1,87 @@
+"""Unit tests: check_render_manifest & save_render_manifest"""
+
+import os
+
+import pytest
+
+
+@pytest.mark.parametrize(
+    "change",
+    [None, "source", "mode", "include", "env", "class", "output", "no-cache"],
+)
+def test_render_manifest(runner, yadm, tmpdir, change):
+    """Unchanged templates are not rendered again"""
+
+    data = tmpdir.mkdir("data")
+    work = tmpdir.mkdir("work")
+    work.join("include").write("included\n")
+    first = work.join("first##template")
+    first.write('{{ env.TEST_VAR }} {{ yadm.class }}\n{% include "include" %}\n')
+    second = work.join("second##template")
+    second.write("{{ yadm.user }}\n")
+    calls = tmpdir.join("calls")
+    awk = tmpdir.join("awk")
+    awk.write(
+        "#!/bin/sh\n"
+        f'for arg; do case "$arg" in *"##template") echo "$arg";; esac; done >> {calls}\n'
+        'exec awk "$@"\n'
+    )
+    awk.chmod(0o755)
+
+    script = f"""
+        YADM_TEST=1 source {yadm}
+        YADM_DATA={data}
+        configure_paths
+        AWK_PROGRAM=({awk})
+        local_class="test"
+        local_user="me"
+        alt_targets=({work}/first {work}/second)
+        alt_sources=({first} {second})
+        alt_template_processors=(default default)
+        function update_exclude() {{ :; }}
+        export TEST_VAR=value
+        alt_linking
+    """
+    run = runner(command=["bash"], inp=script)
+    assert run.success
+    assert run.err == ""
+    assert work.join("first").read() == "value test\nincluded\n"
+    assert work.join("second").read() == "me\n"
+    assert data.join("render-manifest").exists()
+    assert calls.read() == f"{first}\n{second}\n"
+    calls.remove()
+
+    expected = "value test\nincluded\n"
+    if change == "source":
+        first.write("{{ env.TEST_VAR }}\n")
+        expected = "value\n"
+    elif change == "mode":
+        first.chmod(0o755)
+    elif change == "include":
+        work.join("include").write("changed\n")
+        expected = "value test\nchanged\n"
+    elif change == "env":
+        script = script.replace("TEST_VAR=value", "TEST_VAR=changed")
+        expected = "changed test\nincluded\n"
+    elif change == "class":
+        script = script.replace('local_class="test"', 'local_class="changed"')
+        expected = "value changed\nincluded\n"
+    elif change == "output":
+        work.join("first").write("edited\n")
+    elif change == "no-cache":
+        script = script.replace("alt_linking", "use_cache=0 alt_linking")
+
+    run = runner(command=["bash"], inp=script)
+    assert run.success
+    assert run.err == ""
+    assert work.join("first").read() == expected
+    assert work.join("second").read() == "me\n"
+    assert os.stat(work.join("first")).st_mode == os.stat(first).st_mode
+    if change is None:
+        assert not calls.exists()
+    elif change in ("class", "no-cache"):
+        # every template uses the yadm variables
+        assert calls.read() == f"{first}\n{second}\n"
+    else:
+        # only the changed template is rendered
+        assert calls.read() == f"{first}\n"
@@ -0,0 +1,166 @@
+"""Unit tests: render_templates"""
+
+ESH = """#!/bin/sh
+name="${1##*/}"
+echo "start $name" >> "$MARKERS"
+trap 'echo "end $name" >> "$MARKERS"' EXIT
+if [ "$JOBS" -gt 1 ] && [ "$name" = "one##template.esh" ]; then
+  # wait for the next template to be started by another job
+  for i in $(seq 100); do
+    grep -q "^start fail1" "$MARKERS" && break
+    sleep 0.1
+  done
+fi
+case "$1" in
+  *fail*) echo "esh: unable to render $1" >&2; exit 1;;
+  *warn*) echo "esh: warning for $1" >&2;;
+  *reader*) cat "$CONFIG"; exit;;
+esac
+cat "$1"
+"""
+
+
+def test_render_templates_jobs(runner, yadm, tmpdir):
+    """Templates are rendered by parallel jobs, reported in order"""
+
+    esh = tmpdir.join("esh")
+    esh.write(ESH)
+    esh.chmod(0o755)
+    config = tmpdir.join("config")
+
+    names = ["config", "one", "fail1", "warn", "reader", "fail2", "two"]
+    sources = []
+    for name in names:
+        source = tmpdir.join(f"{name}##template.esh")
+        source.write(f"{name} content\n")
+        sources.append(str(source))
+
+    def run_alt(jobs):
+        outputs = tmpdir.mkdir(f"jobs{jobs}")
+        markers = outputs.join("markers")
+        targets = [str(config)] + [str(outputs.join(name)) for name in names[1:]]
+        if config.exists():
+            config.remove()
+        script = f"""
+            YADM_TEST=1 source {yadm}
+            YADM_DATA={tmpdir}
+            configure_paths
+            YADM_CONFIG={config}
+            ESH_PROGRAM={esh}
+            export CONFIG={config}
+            export MARKERS={markers}
+            export JOBS={jobs}
+            alt_jobs={jobs}
+            alt_targets=({" ".join(targets)})
+            alt_sources=({" ".join(sources)})
+            alt_template_processors=({" ".join(["esh"] * len(names))})
+            function update_exclude() {{ :; }}
+            alt_linking
+        """
+        run = runner(command=["bash"], inp=script)
+        assert run.success
+        assert outputs.join("reader").read() == "config content\n"
+        assert not outputs.join("fail1").exists()
+        assert outputs.join("two").read() == "two content\n"
+
+        # the most templates rendered at the same time
+        running = []
+        most = 0
+        for line in markers.read().splitlines():
+            event, name = line.split(" ", 1)
+            if event == "start":
+                running.append(name)
+                most = max(most, len(running))
+            else:
+                running.remove(name)
+        assert not running
+        return run, most
+
+    serial, serial_most = run_alt(1)
+    parallel, parallel_most = run_alt(4)
+    assert serial.err.count("Error: failed to process template") == 2
+    assert parallel.out == serial.out.replace("/jobs1/", "/jobs4/")
+    assert parallel.err == serial.err
+    assert serial_most == 1
+    assert 1 < parallel_most <= 4
+
+
+def test_render_templates_jinja_includes(runner, yadm, tmpdir):
+    """Jinja templates with includes are rendered in their turn"""
+
+    calls = tmpdir.join("calls")
+    sources = []
+    for name, content in [
+        ("one", "one\n"),
+        ("include", "{% include 'one' %}\n"),
+        ("two", "two\n"),
+        ("extends", "{%- extends 'base' %}\n"),
+    ]:
+        source = tmpdir.join(f"{name}##template.j2")
+        source.write(content)
+        sources.append(str(source))
+    outputs = tmpdir.mkdir("outputs")
+    targets = [str(outputs.join(f"target{index}")) for index in range(len(sources))]
+
+    script = f"""
+        YADM_TEST=1 source {yadm}
+        YADM_DATA={tmpdir}
+        configure_paths
+        alt_targets=({" ".join(targets)})
+        alt_sources=({" ".join(sources)})
+        alt_template_processors=({" ".join(["j2cli"] * len(sources))})
+        function template_j2cli() {{
+          echo "$#" "${{@##*/}}" >> {calls}
+          if [ "$#" -eq 1 ]; then
+            cat "$1"
+          else
+            for ((i = 1; i < $#; i += 2)); do
+              j=$((i + 1))
+              cat "${{!i}}" > "${{!j}}.out"
+            done
+          fi
+        }}
+        function update_exclude() {{ :; }}
+        alt_linking
+    """
+    run = runner(command=["bash"], inp=script)
+    assert run.success
+    assert calls.read().splitlines() == [
+        "4 one##template.j2 0 two##template.j2 2",
+        "1 include##template.j2",
+        "1 extends##template.j2",
+    ]
+
+
+def test_render_templates_jobs_includes(runner, yadm, tmpdir):
+    """Templates including other files aren't rendered by parallel jobs"""
+
+    esh = tmpdir.join("esh")
+    esh.write(f'#!/bin/sh\necho "${{1##*/}}" >> {tmpdir.join("calls")}\ncat "$1"\n')
+    esh.chmod(0o755)
+
+    sources = []
+    for name, content in [("include", "<%+ other %>\n"), ("one", "one\n"), ("two", "two\n")]:
+        source = tmpdir.join(f"{name}##template.esh")
+        source.write(content)
+        sources.append(str(source))
+    outputs = tmpdir.mkdir("outputs")
+    targets = [str(outputs.join(f"target{index}")) for index in range(len(sources))]
+
+    script = f"""
+        YADM_TEST=1 source {yadm}
+        YADM_DATA={tmpdir}
+        configure_paths
+        ESH_PROGRAM={esh}
+        alt_jobs=2
+        alt_targets=({" ".join(targets)})
+        alt_sources=({" ".join(sources)})
+        alt_template_processors=(esh esh esh)
+        function update_exclude() {{ :; }}
+        alt_linking
+    """
+    run = runner(command=["bash"], inp=script)
+    assert run.success
+    calls = tmpdir.join("calls").read().splitlines()
+    assert sorted(calls[:2]) == ["one##template.esh", "two##template.esh"]
+    assert calls[2:] == ["include##template.esh"]
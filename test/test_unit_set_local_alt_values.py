@@ -34,7 +34,7 @@ def test_set_local_alt_values(
     """Test handling of local alt values"""
     script = f"""
         YADM_TEST=1 source {yadm} &&
-        set_operating_system &&
+        YADM_DATA={paths.data} set_host_facts &&
         YADM_DIR={paths.yadm} YADM_DATA={paths.data} configure_paths &&
         set_local_alt_values
         echo "class='$local_class'"
@@ -331,3 +331,74 @@ def test_env(runner, yadm, tmpdir):
     assert run.success
     assert run.err == ""
     assert output_file.read().strip() == os.environ["PWD"]
+
+
+def test_batch(runner, yadm, tmpdir):
+    """Test rendering a batch of templates with a single awk process"""
+
+    tmpdir.join("include").write(INCLUDE_BASIC)
+    templates = {
+        "template": TEMPLATE,
+        "empty": "",
+        "with_include": '{% include "include" %}\n{{ yadm.source }}\n',
+        "nested_ifs": TEMPLATE_NESTED_IFS,
+        "missing_include": 'before\n{% include "missing" %}\nafter\n',
+        "else": "{% else %}\n",
+        "endif": "{% endif %}\n",
+        "unterminated": '{% if yadm.user == "me" %}\n',
+        "after_errors": "{{ yadm.user }} {{ yadm.classes }}\n",
+    }
+    inputs = []
+    for name, content in templates.items():
+        input_file = tmpdir.join(name)
+        input_file.write(content)
+        inputs.append(str(input_file))
+    inputs.append(str(tmpdir.join("missing_input")))
+
+    setup = f"""
+        YADM_TEST=1 source {yadm}
+        set_awk
+        local_class="{LOCAL_CLASS}"
+        local_classes=("{LOCAL_CLASS2}" "{LOCAL_CLASS}")
+        local_user="me"
+        inputs=({" ".join(inputs)})
+    """
+    single = runner(
+        command=["bash"],
+        inp=setup
+        + """
+        for input in "${inputs[@]}"; do
+          template default "$input" "$input.single"
+        done
+        # template() fails for missing_input, the last of the inputs
+        true
+    """,
+    )
+    batch = runner(
+        command=["bash"],
+        inp=setup
+        + f"""
+        staging_dir={tmpdir.mkdir("staging")}
+        batch=()
+        for ((index = 0; index < ${{#inputs[@]}}; ++index)); do
+          batch+=("${{inputs[$index]}}" "$staging_dir/$index")
+        done
+        template_default "${{batch[@]}}" || echo "batch failed"
+        for ((index = 0; index < ${{#inputs[@]}}; ++index)); do
+          template default "${{inputs[$index]}}" "${{inputs[$index]}}.batch" "$staging_dir/$index"
+        done
+        # template() fails for missing_input, the last of the inputs
+        true
+    """,
+    )
+    assert single.success
+    assert batch.success
+    assert batch.out == single.out
+    assert batch.err == single.err
+    assert single.err.count("Error: failed to process template") == 5
+    for input_file in inputs:
+        single_output = tmpdir.join(f"{input_file}.single")
+        batch_output = tmpdir.join(f"{input_file}.batch")
+        assert single_output.exists() == batch_output.exists()
+        if single_output.exists():
+            assert batch_output.read() == single_output.read()
@@ -173,3 +173,72 @@ def test_source(runner, yadm, tmpdir, processor):
     assert run.err == ""
     assert output_file.read().strip() == str(input_file)
     assert os.stat(output_file).st_mode == os.stat(input_file).st_mode
+
+
+@pytest.mark.parametrize("processor", ("j2cli", "envtpl"))
+def test_batch(runner, yadm, tmpdir, processor):
+    """Test rendering a batch of templates with a single process"""
+
+    templates = {
+        "template": TEMPLATE,
+        "source": "{{YADM_SOURCE}}",
+        "empty": "",
+        "invalid": "{% if %}",
+        "after_invalid": "{{YADM_USER}}\n\n",
+    }
+    inputs = []
+    for name, content in templates.items():
+        input_file = tmpdir.join(name)
+        input_file.write(content)
+        inputs.append(str(input_file))
+
+    setup = f"""
+        YADM_TEST=1 source {yadm}
+        local_class="{LOCAL_CLASS}"
+        local_classes=("{LOCAL_CLASS2}" "{LOCAL_CLASS}")
+        local_arch="{LOCAL_ARCH}"
+        local_system="{LOCAL_SYSTEM}"
+        local_host="{LOCAL_HOST}"
+        local_user="{LOCAL_USER}"
+        local_distro="{LOCAL_DISTRO}"
+        local_distro_family="{LOCAL_DISTRO_FAMILY}"
+        inputs=({" ".join(inputs)})
+    """
+    single = runner(
+        command=["bash"],
+        inp=setup
+        + f"""
+        for input in "${{inputs[@]}}"; do
+          template {processor} "$input" "$input.single"
+        done
+    """,
+    )
+    batch = runner(
+        command=["bash"],
+        inp=setup
+        + f"""
+        staging_dir={tmpdir.mkdir("staging")}
+        batch=()
+        for ((index = 0; index < ${{#inputs[@]}}; ++index)); do
+          batch+=("${{inputs[$index]}}" "$staging_dir/$index")
+        done
+        template_{processor} "${{batch[@]}}" || echo "batch failed"
+        for ((index = 0; index < ${{#inputs[@]}}; ++index)); do
+          template {processor} "${{inputs[$index]}}" "${{inputs[$index]}}.batch" "$staging_dir/$index"
+        done
+    """,
+    )
+    assert single.success
+    assert batch.success
+    assert batch.out == single.out
+    assert single.err.count("Error: failed to process template") == 1
+    assert batch.err.count("Error: failed to process template") == 1
+    assert "Traceback" not in batch.err
+    assert "Error: line 1: jinja2.exceptions.TemplateSyntaxError:" in batch.err
+    for input_file in inputs:
+        single_output = tmpdir.join(f"{input_file}.single")
+        batch_output = tmpdir.join(f"{input_file}.batch")
+        assert single_output.exists() == batch_output.exists()
+        if single_output.exists():
+            assert batch_output.read() == single_output.read()
+    assert tmpdir.join("template.batch").read() == EXPECTED